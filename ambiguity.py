@@ -0,0 +1,78 @@
+"""
+Heuristic check for questions too vague to turn into SQL.
+
+Kept free of heavy imports and fully annotated so it can be compiled with
+mypyc (``mypyc ambiguity.py``); the compiled extension is picked up in place
+of this file transparently.
+"""
+import functools
+import re
+from typing import Final
+
+# Patterns and term sets are built once at import
+_VAGUE_RE: Final = re.compile(r"\b(?:best|top|most|highest|lowest|biggest|popular|trending|leading|fastest)\b")
+_BY_RE: Final = re.compile(r"\bby\s+[\w\- ]{2,}")
+_NUM_LIMIT_RE: Final = re.compile(r"\b(?:top|best|bottom|highest|lowest|fastest)\s+\d+\b")
+_TIME_RE: Final = re.compile(
+    r"\b20\d{2}\b"
+    r"|\bq[1-4]\s*20\d{2}\b"
+    r"|\b(?:last|past|this)\s+(?:year|quarter|month|week|day|\d+\s+(?:days|weeks|months|years))\b"
+    r"|\bmonth[-\s]?over[-\s]?month\b",
+    re.IGNORECASE,
+)
+_METRIC_RE: Final = re.compile(
+    r"revenue|sales|profit|spend|order value|aov|margin|gmv"
+    r"|units|quantity|orders|growth|grew|increase|decrease"
+    r"|rate|avg|average|mean"
+)
+
+@functools.lru_cache(maxsize=4096)
+def is_ambiguous(question: str) -> bool:
+    """
+    Determine if a natural language question is ambiguous for SQL generation.
+
+    This function checks if the input question is too vague or lacks sufficient detail
+    to generate a precise SQL query. It flags questions as ambiguous if they are too short,
+    contain superlative or ranking terms (e.g., "best", "top", "most"), and do not include
+    clarifying details such as a metric, numeric limit, grouping clause, or time context.
+
+    Parameters
+    ----------
+    question : str
+        The user's natural language question about the data.
+
+    Returns
+    -------
+    bool
+        True if the question is ambiguous and needs clarification, False otherwise.
+
+    Notes
+    -----
+    The check is pure, so results are memoized; use ``is_ambiguous.cache_clear()``
+    to reset between tests.
+    """
+    text = question.lower()
+
+    # Bounded split: stop once enough words are seen instead of splitting the whole question.
+    min_word_count = 4
+    if len(text.split(maxsplit=min_word_count - 1)) < min_word_count:
+        return True
+
+    # Only ranking/superlative words can be ambiguous.
+    contains_vague = _VAGUE_RE.search(text) is not None
+
+    # If there's no superlative/ranking word, it's not ambiguous (filter queries pass).
+    if not contains_vague:
+        return False
+
+    # For superlative/ranking queries, allow if any clarifier exists.
+    # Cheapest/most common clarifiers are checked first; the first hit wins.
+    if _METRIC_RE.search(text):
+        return False
+    if _NUM_LIMIT_RE.search(text):
+        return False
+    if _BY_RE.search(text):                 # e.g., "by total spend"
+        return False
+
+    # Ambiguous only if NONE of the clarifiers are present.
+    return _TIME_RE.search(text) is None
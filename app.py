@@ -1,78 +1,151 @@
-from langchain_community.utilities import SQLDatabase
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+import functools
+import json
 import re
-from pathlib import Path
-from models.llm import get_llm
+from ambiguity import is_ambiguous
+from prompts import load_prompt
 
-# Initialize DB and LLMs
-db = SQLDatabase.from_uri("sqlite:///sales.db")
-llm = get_llm()
+# Complete "SQL" string field of the model's JSON reply (escape-aware)
+_SQL_FIELD_RE = re.compile(r'"SQL"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
 
-# Load prompts
-ROOT = Path(__file__).resolve().parent
-system_message = (ROOT / "prompts/sql_system.md").read_text(encoding="utf-8")
-user_prompt = (ROOT / "prompts/sql_user.md").read_text(encoding="utf-8")
+# Upper bound on rows returned by execute_query
+MAX_RESULT_ROWS = 100
 
-# Parser that expects/parse JSON from the model
-parser = JsonOutputParser()
-
-query_prompt_template = ChatPromptTemplate(
-    [("system", system_message), ("system", "{format_instructions}"), ("user", user_prompt)]
+CLARIFICATION_MESSAGE = (
+    "Your question seems a bit unclear. "
+    "Could you please specify what metric or time period you’re interested in?"
 )
 
-def is_ambiguous(question: str) -> bool:
+# SQLAlchemy, LangChain and the OpenAI client are imported on first use so that
+# vague questions (and CLI start-up) never pay for loading them.
+
+@functools.lru_cache(maxsize=None)
+def get_engine():
+    """
+    Return the shared SQLAlchemy engine for the sales database, creating it on first use.
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+        Engine backed by a single persistent SQLite connection.
+    """
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import StaticPool
+
+    # A single long-lived connection, reused by every query
+    engine = create_engine(
+        "sqlite:///sales.db",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Tune each new SQLite connection: WAL journal, relaxed fsync, larger page cache."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine
+
+@functools.lru_cache(maxsize=None)
+def get_db():
+    """
+    Return the LangChain SQLDatabase wrapper around the shared engine.
+
+    Returns
+    -------
+    SQLDatabase
+        Database handle used for schema reflection.
+    """
+    from langchain_community.utilities import SQLDatabase
+
+    return SQLDatabase(engine=get_engine())
+
+@functools.lru_cache(maxsize=None)
+def get_table_info() -> str:
+    """
+    Return the table info given to the LLM, reflected once per process.
+
+    Returns
+    -------
+    str
+        Schema description with sample rows, as produced by ``SQLDatabase.get_table_info``.
+    """
+    return get_db().get_table_info()
+
+@functools.lru_cache(maxsize=None)
+def _query_chain():
     """
-    Determine if a natural language question is ambiguous for SQL generation.
+    Build the prompt | llm chain and its JSON parser once.
 
-    This function checks if the input question is too vague or lacks sufficient detail
-    to generate a precise SQL query. It flags questions as ambiguous if they are too short,
-    contain superlative or ranking terms (e.g., "best", "top", "most"), and do not include
-    clarifying details such as a metric, numeric limit, grouping clause, or time context.
+    The system prompt depends only on the dialect, schema and format
+    instructions, so it is rendered once into a fixed ``SystemMessage``; per
+    call, the template only formats the user question.
+
+    Returns
+    -------
+    tuple
+        ``(chain, parser)``. The chain stops at the LLM so the response can be
+        streamed; the parser is applied only as a fallback.
+    """
+    from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
+    from models.llm import get_llm
+    from models.parsers import FastJsonOutputParser
+
+    # Parser that expects/parse JSON from the model
+    parser = FastJsonOutputParser()
+
+    # Static content (instructions, schema, format) forms one system block so the
+    # prompt prefix is byte-identical across calls; only the question varies.
+    system_prompt = SystemMessagePromptTemplate.from_template(
+        load_prompt("sql_system.md") + "\n\n{format_instructions}"
+    ).format(
+        dialect=get_db().dialect,
+        top_k=10,
+        table_info=get_table_info(),
+        format_instructions=parser.get_format_instructions(),
+    )
+    query_prompt_template = ChatPromptTemplate(
+        [system_prompt, ("user", load_prompt("sql_user.md"))]
+    )
+    return query_prompt_template | get_llm(), parser
+
+@functools.lru_cache(maxsize=1024)
+def _cached_invoke(question: str) -> str:
+    """
+    Stream the query chain, extract the SQL, and memoize it for repeated questions.
+
+    Generation is cut off once the ``"SQL"`` field of the JSON reply is complete.
+    The LLM runs at temperature 0 and the table info is fixed for the process
+    lifetime, so identical questions produce the same SQL.
 
     Parameters
     ----------
     question : str
-        The user's natural language question about the data.
+        The business question to translate into an SQL query.
 
     Returns
     -------
-    bool
-        True if the question is ambiguous and needs clarification, False otherwise.
+    str
+        The parsed model output encoded as JSON, so each caller decodes a fresh dict.
     """
-    text = question.lower()
-
-    min_word_count = 4
-    if len(text.split()) < min_word_count:
-        return True
-
-    # Only ranking/superlative words can be ambiguous.
-    vague_terms = ("best","top","most","highest","lowest","biggest","popular","trending","leading","fastest")
-    contains_vague = any(re.search(rf"\b{t}\b", text) for t in vague_terms)
-
-    # If there's no superlative/ranking word, it's not ambiguous (filter queries pass).
-    if not contains_vague:
-        return False
-
-    # For superlative/ranking queries, allow if any clarifier exists.
-    has_by_clause      = bool(re.search(r"\bby\s+[\w\- ]{2,}", text))                 # e.g., "by total spend"
-    has_numeric_limit  = bool(re.search(r"\b(?:top|best|bottom|highest|lowest|fastest)\s+\d+\b", text))
-    has_metric_term    = any(m in text for m in (
-        "revenue","sales","profit","spend","order value","aov","margin","gmv",
-        "units","quantity","orders","growth","grew","increase","decrease",
-        "rate","avg","average","mean"
-    ))
-    has_time_context   = bool(re.search(
-        r"""\b(20\d{2})\b
-            | \bq[1-4]\s*20\d{2}\b
-            | \b(last|past|this)\s+(year|quarter|month|week|day|\d+\s+(days|weeks|months|years))\b
-            | \bmonth[-\s]?over[-\s]?month\b
-        """, text, re.IGNORECASE | re.VERBOSE))
-
-    # Ambiguous only if NONE of the clarifiers are present.
-    has_clarity = has_metric_term or has_by_clause or has_numeric_limit or has_time_context
-    return not has_clarity
+    chain, parser = _query_chain()
+
+    # Stream the reply and stop as soon as the SQL string is closed; anything the
+    # model emits afterwards is never generated.
+    buffer = ""
+    for chunk in chain.stream({"input": question}):
+        buffer += chunk.content
+        match = _SQL_FIELD_RE.search(buffer)
+        if match:
+            return json.dumps({"SQL": json.loads(f'"{match.group(1)}"', strict=False)})
+
+    # No complete SQL field was streamed; let the JSON parser make sense of it.
+    return json.dumps(parser.parse(buffer))
 
 def write_query(question: str) -> dict:
     """
@@ -86,31 +159,20 @@ def write_query(question: str) -> dict:
     Returns
     -------
     dict
-        Dictionary containing the generated SQL query with key 'SQL'.
+        Dictionary containing the generated SQL query with key 'SQL', or error
+        information if the question is ambiguous or generation fails.
     """
-    try:
-        chain = query_prompt_template | llm | parser
+    # Vague questions never reach the LLM
+    if is_ambiguous(question):
+        return {"error": True, "message": CLARIFICATION_MESSAGE}
 
+    try:
         """Generate SQL query to fetch information."""
-        result = chain.invoke(
-            {
-                "dialect": db.dialect,
-                "top_k": 10,
-                "table_info": db.get_table_info(),
-                "input": question,
-                "format_instructions": parser.get_format_instructions(),
-            }
-        )
+        result = json.loads(_cached_invoke(question))
 
         # Handle empty or incomplete SQL
         if not result["SQL"] or len(result["SQL"].split()) < 3:
-            return {
-                "error": True,
-                "message": (
-                    "Your question seems a bit unclear. "
-                    "Could you please specify what metric or time period you’re interested in?"
-                ),
-            }
+            return {"error": True, "message": CLARIFICATION_MESSAGE}
 
         return result
     except Exception as e:
@@ -134,11 +196,36 @@ def execute_query(sql: str) -> dict:
     Returns
     -------
     dict
-        Dictionary containing the query result with key 'result', or error information if execution fails.
+        Dictionary with the column names under 'columns', the rows as tuples under
+        'result' (at most ``MAX_RESULT_ROWS``), and 'truncated' set when more rows
+        were available; or error information if execution fails.
     """
+    # Reject empty, non-SELECT and multi-statement SQL without touching the database
+    statement = sql.strip().rstrip(";")
+    if not statement.upper().startswith(("SELECT", "WITH")) or ";" in statement:
+        return {
+            "error": True,
+            "message": (
+                "Query execution skipped: only a single SELECT statement can be run. "
+                "Please rephrase your question."
+            ),
+        }
+
     try:
-        result = db.run(sql)
-        return {"result": result}
+        from sqlalchemy import text
+
+        # Stream rows off the cursor rather than formatting the full result as a string
+        # Rows stay tuples so same-named columns (e.g. from joins) are all kept;
+        # one extra row is fetched to tell whether the cap cut the result short.
+        with get_engine().connect() as conn:
+            cursor = conn.execute(text(sql))
+            columns = list(cursor.keys())
+            rows = cursor.fetchmany(MAX_RESULT_ROWS + 1)
+        return {
+            "columns": columns,
+            "result": [tuple(row) for row in rows[:MAX_RESULT_ROWS]],
+            "truncated": len(rows) > MAX_RESULT_ROWS,
+        }
     except Exception as e:
         return {
             "error": True,
@@ -34,7 +34,7 @@ def main():
         print("\nGenerated SQL:\n", sql_output)
 
         # Execute SQL against the database 
-        if args.execute:
+        if args.execute and "SQL" in sql_output:
             result_output = execute_query(sql_output["SQL"])
             print("\nQuery Result:\n", result_output)
 
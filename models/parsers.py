@@ -0,0 +1,18 @@
+import orjson
+from langchain_core.output_parsers import JsonOutputParser
+
+class FastJsonOutputParser(JsonOutputParser):
+    """
+    JsonOutputParser that decodes complete, plain JSON responses with orjson.
+
+    Anything orjson rejects (markdown fences, partial output) falls back to the
+    stock LangChain parsing.
+    """
+
+    def parse_result(self, result, *, partial=False):
+        if not partial:
+            try:
+                return orjson.loads(result[0].text.strip())
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse_result(result, partial=partial)
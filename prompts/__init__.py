@@ -0,0 +1,29 @@
+import functools
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).resolve().parent
+
+@functools.lru_cache(maxsize=None)
+def _read_prompt(path: Path, mtime_ns: int) -> str:
+    # mtime_ns is only part of the cache key, so edited files are re-read
+    return path.read_text(encoding="utf-8")
+
+def load_prompt(name: str) -> str:
+    """
+    Return the contents of a prompt file in this directory.
+
+    Reads are cached per path and modification time, so re-importing modules
+    that load prompts does not hit the disk again, while edits are still picked up.
+
+    Parameters
+    ----------
+    name : str
+        File name of the prompt, e.g. ``"sql_system.md"``.
+
+    Returns
+    -------
+    str
+        The prompt text.
+    """
+    path = PROMPTS_DIR / name
+    return _read_prompt(path, path.stat().st_mtime_ns)